@@ -4,10 +4,15 @@ Trustpilot Scraper - Complete with all features
 Hardcoded brand and pages for simplicity
 """
 
+import functools
 import json
 import requests
 import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from operator import itemgetter
 import time
 
 # =============================================================================
@@ -16,20 +21,28 @@ import time
 
 BRAND_DOMAIN = "simple-life-app.com"  # Change this to scrape different brand (ketogo.app, happymammoth.com, simple-life-app.com, best.me, certifiedfasting.com)
 MAX_PAGES = 10  # Number of pages to scrape
+PAGE_WORKERS = 4  # Number of pages fetched in parallel
+PRETTY_JSON = True  # Set to False to write compact JSON (smaller and faster to save)
 
 # =============================================================================
 # CONSTANTS
 # =============================================================================
 
 QUERY_PARAMS = "?date=last30days&languages=all"
+PAGE_DELAY = 0.2  # Minimum pause (seconds) between page requests per worker
+NEXT_DATA_RE = re.compile(rb'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', re.DOTALL)
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
 }
 
-# Complete topic translation map (K:V pairs)
-with open('tp_topics.json') as f:
-    ALL_TOPICS = json.load(f)
-    print(f"[+] Loaded {len(ALL_TOPICS)} Trustpilot topics")
+# Shared session so requests to Trustpilot reuse pooled keep-alive connections.
+# Rate-limited responses are retried after the server's Retry-After delay.
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504], raise_on_status=False),
+))
 
 
 # =============================================================================
@@ -37,24 +50,33 @@ with open('tp_topics.json') as f:
 # =============================================================================
 
 def extract_next_data(html):
-    """Extract __NEXT_DATA__ JSON from HTML"""
-    match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', html)
+    """Extract __NEXT_DATA__ JSON from the raw HTML bytes"""
+    match = NEXT_DATA_RE.search(html)
     if match:
         return json.loads(match.group(1))
     return None
 
+@functools.cache
+def get_topics():
+    """Load the complete topic translation map (K:V pairs) on first use"""
+    with open('tp_topics.json', encoding='utf-8') as f:
+        topics = json.load(f)
+    print(f"  [+] Loaded {len(topics)} Trustpilot topics")
+    return topics
+
 def get_top_mentions(business_id):
     """Fetch and translate top mentions/topics for the business"""
     url = f'https://www.trustpilot.com/api/businessunitprofile/businessunit/{business_id}/service-reviews/topics'
     try:
-        response = requests.get(url, headers=HEADERS)
-        response_data = json.loads(response.text)
+        response = SESSION.get(url, timeout=10)
+        response_data = json.loads(response.content)
         
         options = response_data['topics']
         
+        all_topics = get_topics()
         translated_topics = []
         for topic in options:
-            readable_name = ALL_TOPICS.get(topic, topic.replace('_', ' ').title())
+            readable_name = all_topics.get(topic, topic.replace('_', ' ').title())
             translated_topics.append(readable_name)
         
         return translated_topics
@@ -62,18 +84,37 @@ def get_top_mentions(business_id):
         print(f"  [!] Failed to fetch top mentions: {e}")
         return []
 
+def fetch_reviews_page(url):
+    """Fetch one paginated page and return its reviews (None past the last page)"""
+    response = SESSION.get(url, timeout=30)
+    # 429/503 responses are retried by the session adapter after Retry-After,
+    # so only a short floor is needed here
+    time.sleep(PAGE_DELAY)
+    
+    if response.status_code == 404:
+        return None
+    
+    data = extract_next_data(response.content)
+    if not data:
+        return None
+    
+    try:
+        return data["props"]["pageProps"]["reviews"] or None
+    except KeyError:
+        return None
+
 def count_past_week_reviews(reviews):
     """Count reviews from the past 7 days"""
-    week_ago = datetime.now() - timedelta(days=7)
+    # publishedDate is a fixed-width ISO timestamp, so comparing strings
+    # gives the same ordering as parsing each one with strptime
+    week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%dT%H:%M:%S.%f")
     count = 0
     
     for review in reviews:
         try:
-            pub_date = review['dates']['publishedDate']
-            review_date = datetime.strptime(pub_date, "%Y-%m-%dT%H:%M:%S.%fZ")
-            if review_date >= week_ago:
+            if review['dates']['publishedDate'] >= week_ago:
                 count += 1
-        except:
+        except (KeyError, TypeError):
             continue
     
     return count
@@ -97,29 +138,29 @@ def scrape_brand(brand_domain, max_pages=10):
     company_data = {}
     business_id = None
     
-    # Step 1: Fetch AI Summary from clean URL
-    print(f"[1] Fetching AI summary and company info...")
-    response_clean = requests.get(BASE_URL_CLEAN, headers=HEADERS)
-    
-    if response_clean.status_code != 200:
-        print(f"[!] Failed to fetch page: HTTP {response_clean.status_code}")
-        return None
-    
-    data_clean = extract_next_data(response_clean.text)
-    if not data_clean:
-        print("[!] Could not extract data from page")
-        return None
+    # Step 1: Fetch filtered reviews (the page also carries company info)
+    print(f"[1] Fetching company info and filtered reviews...")
+    response = SESSION.get(BASE_URL, timeout=30)
+    data = extract_next_data(response.content) if response.status_code == 200 else None
     
-    # Step 2: Fetch filtered reviews
-    print(f"[2] Fetching filtered reviews...")
-    response = requests.get(BASE_URL, headers=HEADERS)
+    # Step 2: Fetch AI Summary from clean URL, only when the filtered page lacks it
+    data_clean = data
+    if not data or not data.get("props", {}).get("pageProps", {}).get("aiSummary"):
+        print(f"[2] Fetching AI summary from clean URL...")
+        response_clean = SESSION.get(BASE_URL_CLEAN, timeout=30)
+        
+        if response_clean.status_code == 200:
+            data_clean = extract_next_data(response_clean.content) or data
+        elif not data:
+            print(f"[!] Failed to fetch page: HTTP {response_clean.status_code}")
+            return None
+        
+        if not data_clean:
+            print("[!] Could not extract data from page")
+            return None
     
-    if response.status_code != 200:
+    if not data:
         data = data_clean
-    else:
-        data = extract_next_data(response.text)
-        if not data:
-            data = data_clean
     
     try:
         # Get AI summary from clean URL data
@@ -139,7 +180,7 @@ def scrape_brand(brand_domain, max_pages=10):
             "trust_score": business_unit["trustScore"],
             "stars": business_unit.get("stars", business_unit["trustScore"]),
             "is_claimed": business_unit.get("isClaimed", False),
-            "categories": [cat["name"] for cat in business_unit.get("categories", [])],
+            "categories": list(map(itemgetter("name"), business_unit.get("categories") or ())),
         }
         
         # Fix logo URL
@@ -167,9 +208,8 @@ def scrape_brand(brand_domain, max_pages=10):
         all_reviews.extend(initial_reviews)
         print(f"  [+] Extracted {len(initial_reviews)} reviews from page 1")
         
-        # Get Top Mentions
-        if business_id:
-            company_data["top_mentions"] = get_top_mentions(business_id)
+        # Page count is known up front, so the remaining pages can be fetched in parallel
+        total_pages = page_props.get("filters", {}).get("pagination", {}).get("totalPages")
         
         print(f"\n[+] Company Data Extracted:")
         print(f"    Brand: {company_data['brand_name']}")
@@ -180,38 +220,33 @@ def scrape_brand(brand_domain, max_pages=10):
         print(f"[!] Failed to extract company data: {e}")
         return None
     
-    # Pagination
-    if max_pages and max_pages > 1:
-        print(f"\n[3] Fetching additional pages (up to {max_pages-1} more)...")
-        page = 2
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS + 1) as executor:
+        # Get Top Mentions (independent API call, runs alongside pagination)
+        topics_future = executor.submit(get_top_mentions, business_id) if business_id else None
         
-        while page <= max_pages:
-            print(f"\n  Fetching page {page}...")
-            url = f"{BASE_URL}&page={page}"
-            
-            response = requests.get(url, headers=HEADERS)
+        # Pagination
+        last_page = min(max_pages, total_pages) if max_pages and total_pages else max_pages
+        if last_page and last_page > 1:
+            print(f"\n[3] Fetching additional pages (up to {last_page-1} more)...")
+            page_futures = [
+                executor.submit(fetch_reviews_page, f"{BASE_URL}&page={page}")
+                for page in range(2, last_page + 1)
+            ]
             
-            if response.status_code == 404:
-                print(f"  [X] Reached end of pages")
-                break
-            
-            data = extract_next_data(response.text)
-            if not data:
-                break
-            
-            try:
-                reviews = data["props"]["pageProps"]["reviews"]
+            # Walk results in page order, so reviews keep the order of the sequential walk
+            for page, future in enumerate(page_futures, start=2):
+                reviews = future.result()
                 if not reviews:
+                    print(f"  [X] Reached end of pages")
+                    for pending in page_futures:
+                        pending.cancel()
                     break
                 
                 all_reviews.extend(reviews)
-                print(f"  [+] Extracted {len(reviews)} reviews (Total: {len(all_reviews)})")
-                
-            except KeyError:
-                break
-            
-            page += 1
-            time.sleep(2)
+                print(f"  [+] Extracted {len(reviews)} reviews from page {page} (Total: {len(all_reviews)})")
+        
+        if topics_future:
+            company_data["top_mentions"] = topics_future.result()
     
     # Calculate past week reviews
     past_week_count = count_past_week_reviews(all_reviews)
@@ -252,7 +287,10 @@ def main():
         
         # Save to JSON
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            if PRETTY_JSON:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            else:
+                json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
         
         print(f"\n[✓] Saved to: {filename}")
         print(f"\n[*] Summary:")